@@ -12,12 +12,147 @@ import time
 import random
 from datetime import datetime
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
+import queue
+import http.client
+import urllib.request
 from pathlib import Path
 from PIL import Image, ImageTk
 
+# Optional: libjpeg-turbo bindings for decoding MJPEG streams without FFmpeg
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+except ImportError:
+    TurboJPEG = None
+
+# Optional: Numba-compiled overlay kernel, falls back to cv2 when not installed
+try:
+    import numba
+except ImportError:
+    numba = None
+
+if numba is not None:
+    # Serial on purpose: it's called from the overlay thread, which already runs in
+    # parallel with capture and detection, and Numba's parallel threading layers
+    # aren't safe to drive from arbitrary Python threads
+    @numba.njit(fastmath=True, nogil=True, cache=True)
+    def blend_red(dst, mask):
+        """Blend the nearest-upscaled mask into dst's red channel in place (0.7/0.3 in fixed point)"""
+        height, width = dst.shape[0], dst.shape[1]
+        mask_height, mask_width = mask.shape
+        mask_cols = np.arange(width) * mask_width // width
+        for y in range(height):
+            mask_row = mask[y * mask_height // height]
+            for x in range(width):
+                dst[y, x, 2] = (dst[y, x, 2] * 179 + mask_row[mask_cols[x]] * 77) >> 8
+else:
+    blend_red = None
+
+
+class MJPEGStreamReader:
+    """Read an HTTP multipart MJPEG stream and decode frames with libjpeg-turbo
+    Implements the subset of cv2.VideoCapture used by HalloweenScareSystem"""
+    
+    CONTENT_TYPES = ('multipart/x-mixed-replace', 'image/jpeg')
+    MAX_SCAN_BYTES = 4 * 1024 * 1024  # Give up on a body that has no JPEG markers
+    
+    def __init__(self, url, timeout=5):
+        self._url = url
+        self._timeout = timeout
+        self._jpeg = TurboJPEG()
+        self._buffer = bytearray()
+        self._frame_bytes = None
+        self._response = None
+        error = self._connect()
+        if error:
+            print(f" MJPEG reader not used: {error}")
+    
+    def _connect(self):
+        """Open the URL, returns an error message if it isn't a usable MJPEG stream"""
+        self._buffer.clear()
+        try:
+            response = urllib.request.urlopen(self._url, timeout=self._timeout)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            return f"failed to connect: {e}"
+        
+        # Anything else (MP4, HLS, ...) is left to the GStreamer/FFmpeg fallbacks
+        content_type = response.headers.get_content_type()
+        if content_type not in self.CONTENT_TYPES:
+            response.close()
+            return f"not an MJPEG stream ({content_type})"
+        
+        self._response = response
+        return None
+    
+    def isOpened(self):
+        return self._response is not None
+    
+    def set(self, prop_id, value):
+        # Capture properties are fixed by the camera, same as an unsupported backend property
+        return False
+    
+    def grab(self):
+        """Read from the socket until a complete JPEG (SOI..EOI) is buffered
+        Raises ConnectionError when the stream is lost, the next call reconnects"""
+        if self._response is None:
+            error = self._connect()
+            if error:
+                raise ConnectionError(f"MJPEG stream lost, {error}")
+        
+        scanned = 0
+        while True:
+            start = self._buffer.find(b'\xff\xd8')
+            if start != -1:
+                end = self._buffer.find(b'\xff\xd9', start + 2)
+                if end != -1:
+                    self._frame_bytes = bytes(self._buffer[start:end + 2])
+                    del self._buffer[:end + 2]
+                    return True
+            else:
+                # Multipart headers only, keep a trailing byte in case a marker is split
+                del self._buffer[:-1]
+            
+            # A timed-out socket file can never be read again, so a stall or EOF
+            # drops the response and the next grab() opens a fresh one
+            try:
+                chunk = self._response.read1(65536)
+            except (OSError, http.client.HTTPException) as e:
+                self.release()
+                raise ConnectionError(f"MJPEG stream lost: {e}") from e
+            if not chunk:
+                self.release()
+                raise ConnectionError("MJPEG stream closed by the camera")
+            self._buffer += chunk
+            
+            # Bounded so a body that never yields a frame can't hold the capture thread
+            scanned += len(chunk)
+            if scanned > self.MAX_SCAN_BYTES:
+                self._buffer.clear()
+                return False
+    
+    def retrieve(self):
+        """Decode the last grabbed JPEG straight to a BGR array"""
+        if self._frame_bytes is None:
+            return False, None
+        try:
+            return True, self._jpeg.decode(self._frame_bytes, pixel_format=TJPF_BGR)
+        except (OSError, ValueError):
+            return False, None
+    
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+    
+    def release(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+
 class HalloweenScareSystem:
     def __init__(self, stream_url="http://192.168.29.215:81/stream"):
         self.stream_url = stream_url
@@ -29,9 +164,44 @@ class HalloweenScareSystem:
         self.min_motion_area = 500
         self.cooldown_seconds = 5
         self.last_scare_time = 0
+        self.detection_size = (320, 240)  # Frames are downscaled to this before detection
+        self.display_size = (640, 360)  # GUI preview size
+        self._detect_every = 3  # Run detection on every Nth frame, ~10Hz at 30fps
+        self._detect_tick = 0
+        self._last_motion = (False, [])  # Carried forward on frames that skip detection
+        self.learning_rate = 0.01  # Faster learning
+        self._warmup_frames = 10  # Frames used to seed the background model before detecting
+        self._warmup_remaining = 0
         
         # Background subtraction - optimized for lower latency
+        # MOG2 settings shared by every detection path (CPU, per-strip, OpenCL and CUDA)
+        self.mog2_history = 100  # Reduced from 500 for faster adaptation
+        self.mog2_var_threshold = 16
+        self.mog2_detect_shadows = False  # Disable shadow detection for speed
         self.bg_subtractor = None
+        self._gpu_bgsub = None  # CUDA MOG2, only when a CUDA device is available
+        self._gpu_morph = None
+        self._gpu_frame = None
+        self._gpu_stream = None
+        
+        # CPU path: one MOG2 per horizontal strip, applied in parallel (OpenCV releases the GIL)
+        self.detection_strips = os.cpu_count() or 1
+        self._strip_subtractors = []
+        self._strip_pool = None
+        
+        # Cached structuring element and per-frame buffers. Detection buffers are sized by
+        # detection_size, overlay buffers follow the frame size and belong to the overlay thread
+        self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._small_buf = None
+        self._fg_buf = None
+        self._overlay_shape = None
+        self._display_buf = None
+        self._mask_full_buf = None
+        self._red_buf = None
+        
+        # OpenCL T-API: UMat inputs route MOG2/threshold/morphology to the OpenCL kernels
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        cv2.ocl.setUseOpenCL(self.use_opencl)
         
         # Statistics
         self.detection_count = 0
@@ -43,23 +213,37 @@ class HalloweenScareSystem:
         self.display_frame = None
         self.motion_mask = None
         
-        # Threading for async processing
+        # Threading for async processing: capture -> detect -> overlay -> GUI,
+        # each stage on its own thread with a single-slot queue holding the newest item
         self.processing_lock = threading.Lock()
+        self._display_queue = queue.Queue(maxsize=1)
+        self._stage_threads = []
+        self._stop_event = None  # One per connection, so old threads never see a restart
+        self.last_error = None  # Latest stage failure, shown in the GUI status bar
         
         # Initialize pygame for audio
         pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        pygame.mixer.set_reserved(1)  # Keep channel 0 for scare sounds
+        self._scare_channel = pygame.mixer.Channel(0)
+        # Scares play from the detection thread, Test/Reload run on the Tk thread
+        self._audio_lock = threading.Lock()
         self.audio_files = []
+        self._playlist = []
+        self._playlist_pos = 0
         self.load_scary_sounds()
         
     def load_scary_sounds(self):
         """Load all audio files from scary_sounds folder"""
-        self.audio_files = []
+        # Files are decoded into a local list and swapped in under the lock at the end,
+        # so scares keep playing the old sounds while a reload is in progress
+        audio_files = []
         sounds_dir = Path("scary_sounds")
         
         if not sounds_dir.exists():
             print("Warning: 'scary_sounds' folder not found, creating it...")
             sounds_dir.mkdir(exist_ok=True)
             print("   Please add MP3/WAV files to the 'scary_sounds' folder")
+            self._set_audio_files(audio_files)
             return
         
         # Supported audio formats
@@ -69,89 +253,281 @@ class HalloweenScareSystem:
             for audio_file in sounds_dir.glob(f'*{ext}'):
                 try:
                     sound = pygame.mixer.Sound(str(audio_file))
-                    self.audio_files.append(sound)
+                    sound.set_volume(1.0)
+                    audio_files.append(sound)
                     print(f" Loaded: {audio_file.name}")
                 except Exception as e:
                     print(f" Failed to load {audio_file.name}: {e}")
         
-        if not self.audio_files:
+        if not audio_files:
             print(" No audio files found in 'scary_sounds' folder")
             print("   Using default beep sound")
-            self.create_default_sound()
+            audio_files.append(self.create_default_sound())
         else:
-            print(f" Loaded {len(self.audio_files)} scary sound(s)")
+            print(f" Loaded {len(audio_files)} scary sound(s)")
+        
+        self._set_audio_files(audio_files)
+    
+    def _set_audio_files(self, audio_files):
+        """Swap in a new set of sounds and start a fresh shuffled playlist"""
+        with self._audio_lock:
+            self.audio_files = audio_files
+            self._playlist = list(range(len(audio_files)))
+            self._shuffle_playlist()
+    
+    def _shuffle_playlist(self, last_played=None):
+        """Start a new shuffled pass over the sounds, never repeating the last one played
+        Caller must hold _audio_lock"""
+        random.shuffle(self._playlist)
+        if len(self._playlist) > 1 and self._playlist[0] == last_played:
+            self._playlist[0], self._playlist[-1] = self._playlist[-1], self._playlist[0]
+        self._playlist_pos = 0
     
     def create_default_sound(self):
-        """Create a default scary beep if no audio files found"""
+        """Create the default scary beep used when no audio files are found"""
         sample_rate = 22050
         duration = 1.0
         frequency = 200
         
-        t = np.linspace(0, duration, int(sample_rate * duration))
-        tone = np.sin(2 * np.pi * frequency * t)
-        tremolo = np.sin(2 * np.pi * 6 * t)
-        scary_tone = tone * (0.5 + 0.5 * tremolo)
-        scary_tone = (scary_tone * 32767).astype(np.int16)
-        stereo_tone = np.column_stack((scary_tone, scary_tone))
+        # float32 throughout, in-place ops avoid temporaries
+        n_samples = int(sample_rate * duration)
+        t = np.linspace(0, duration, n_samples, dtype=np.float32)
+        tone = np.sin(np.float32(2 * np.pi * frequency) * t)
+        tremolo = np.sin(np.float32(2 * np.pi * 6) * t)
+        
+        # tone * (0.5 + 0.5 * tremolo) * 32767
+        tremolo *= 0.5
+        tremolo += 0.5
+        tone *= tremolo
+        tone *= 32767
         
-        self.audio_files = [pygame.sndarray.make_sound(stereo_tone)]
+        # Broadcast into both stereo channels in a single int16 pass
+        stereo_tone = np.empty((n_samples, 2), np.int16)
+        stereo_tone[:] = tone[:, np.newaxis]
+        
+        return pygame.sndarray.make_sound(stereo_tone)
     
     def play_scare_sound(self):
-        """Play a random scary sound"""
+        """Play the next scary sound from the shuffled playlist"""
         try:
-            if self.audio_files:
-                sound = random.choice(self.audio_files)
-                sound.set_volume(1.0)
-                sound.play()
-                return True
+            with self._audio_lock:
+                if self.audio_files:
+                    index = self._playlist[self._playlist_pos]
+                    self._playlist_pos += 1
+                    if self._playlist_pos == len(self._playlist):
+                        self._shuffle_playlist(last_played=index)
+                    self._scare_channel.play(self.audio_files[index])
+                    return True
         except Exception as e:
             print(f" Audio error: {e}")
             return False
     
-    def detect_motion(self, frame):
-        """Detect motion using background subtraction - optimized for speed"""
+    def detect_motion(self, frame, frame_shape=None):
+        """Detect motion using background subtraction - optimized for speed
+        frame_shape is required for UMat frames, which don't expose their size"""
         if self.bg_subtractor is None:
             return False, None, [], 0
         
-        fg_mask = self.bg_subtractor.apply(frame, learningRate=0.01)  # Faster learning
-        _, fg_mask = cv2.threshold(fg_mask, 250, 255, cv2.THRESH_BINARY)
+        # Run detection on a downscaled copy, a quarter of the pixels at 640x480
+        if frame_shape is None:
+            frame_shape = frame.shape
+        frame_height, frame_width = frame_shape[:2]
+        self._ensure_buffers()
+        if isinstance(frame, cv2.UMat):
+            small = cv2.resize(frame, self.detection_size, interpolation=cv2.INTER_AREA)
+        else:
+            small = cv2.resize(frame, self.detection_size, dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        scale_x = frame_width / self.detection_size[0]
+        scale_y = frame_height / self.detection_size[1]
+        
+        # Seed the background model before acting on it: the first applies use the
+        # automatic rate (1/n) like a warm-up loop would, and their result is discarded
+        if self._warmup_remaining > 0:
+            learning_rate = -1
+        else:
+            # The model is only fed every Nth frame, compound the per-frame rate
+            # so it adapts to the scene at the same speed in real time
+            learning_rate = 1 - (1 - self.learning_rate) ** self._detect_every
         
-        # Simplified morphological operations for speed
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))  # Smaller kernel
-        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel, iterations=1)
+        if self._gpu_bgsub is not None:
+            fg_mask = self._gpu_foreground_mask(small, learning_rate)
+        else:
+            fg_mask = self._cpu_foreground_mask(small, learning_rate)
         
-        contours_result = cv2.findContours(
-            fg_mask, 
-            cv2.RETR_EXTERNAL, 
-            cv2.CHAIN_APPROX_SIMPLE
-        )
-        contours = contours_result[0] if len(contours_result) == 2 else contours_result[1]
+        # Re-checked after the apply: a CUDA failure falls back to a fresh CPU model
+        # mid-call and restarts the warm-up, so this frame's mask must be discarded too
+        if self._warmup_remaining > 0:
+            self._warmup_remaining -= 1
+            return False, None, [], 0
+        
+        # Component stats give every blob's area and bounding box in one call,
+        # so filtering is a vector comparison instead of a Python loop over contours
+        _, _, stats, _ = cv2.connectedComponentsWithStats(fg_mask, connectivity=8)
+        stats = stats[1:]  # Label 0 is the background
         
-        motion_detected = False
-        total_motion_area = 0
-        motion_contours = []
+        # Areas are measured on the small mask, scale them back to full-frame pixels
+        areas = stats[:, cv2.CC_STAT_AREA] * (scale_x * scale_y)
+        keep = areas > self.min_motion_area
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.min_motion_area:
-                motion_contours.append(contour)
-                total_motion_area += area
-                motion_detected = True
+        motion_detected = bool(keep.any())
+        total_motion_area = float(areas[keep].sum())
         
-        return motion_detected, fg_mask, motion_contours, total_motion_area
+        rects = stats[keep, cv2.CC_STAT_LEFT:cv2.CC_STAT_HEIGHT + 1]
+        motion_boxes = (rects * (scale_x, scale_y, scale_x, scale_y)).astype(int).tolist()
+        
+        return motion_detected, fg_mask, motion_boxes, total_motion_area
     
-    def draw_overlay(self, frame, fg_mask, motion_contours, motion_detected):
-        """Draw motion detection overlay on frame"""
-        display_frame = frame.copy()
+    def _cpu_foreground_mask(self, small, learning_rate):
+        """MOG2 + threshold + morphology on the CPU, or through OpenCL when available"""
+        if isinstance(small, cv2.UMat):
+            # UMat results come from OpenCV's own buffer pool
+            fg_mask = self.bg_subtractor.apply(small, learningRate=learning_rate)
+            _, fg_mask = cv2.threshold(fg_mask, 250, 255, cv2.THRESH_BINARY)
+            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self._morph_kernel, iterations=1)
+            
+            # Component labelling needs host memory
+            return fg_mask.get()
         
-        if fg_mask is not None:
-            motion_overlay = cv2.cvtColor(fg_mask, cv2.COLOR_GRAY2BGR)
-            motion_overlay[:, :, 0] = 0
-            motion_overlay[:, :, 1] = 0
-            display_frame = cv2.addWeighted(display_frame, 0.7, motion_overlay, 0.3, 0)
+        if self._strip_pool is not None:
+            fg_mask = self._apply_strips(small, learning_rate)
+        else:
+            fg_mask = self.bg_subtractor.apply(small, fgmask=self._fg_buf, learningRate=learning_rate)
+        cv2.threshold(fg_mask, 250, 255, cv2.THRESH_BINARY, dst=fg_mask)
         
-        for contour in motion_contours:
-            x, y, w, h = cv2.boundingRect(contour)
+        # Simplified morphological operations for speed. The result is handed to the
+        # overlay stage while detection moves on, so it gets a fresh (small) array
+        return cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self._morph_kernel, iterations=1)
+    
+    def _apply_strips(self, small, learning_rate):
+        """Run each strip's MOG2 on its rows in the thread pool and stitch the masks together"""
+        bounds = np.linspace(0, small.shape[0], len(self._strip_subtractors) + 1).astype(int)
+        masks = self._strip_pool.map(
+            lambda job: job[0].apply(small[job[1]:job[2]], learningRate=learning_rate),
+            zip(self._strip_subtractors, bounds[:-1], bounds[1:])
+        )
+        return np.concatenate(list(masks), out=self._fg_buf)
+    
+    def _create_bg_subtractor(self):
+        """Create a CPU MOG2 with the shared settings"""
+        return cv2.createBackgroundSubtractorMOG2(
+            history=self.mog2_history,
+            varThreshold=self.mog2_var_threshold,
+            detectShadows=self.mog2_detect_shadows
+        )
+    
+    def _init_strip_detection(self):
+        """Create one MOG2 per strip - pixels are modelled independently, so strips share no state
+        Only used on the plain CPU path, CUDA and OpenCL run a single model"""
+        self._shutdown_strip_pool()
+        if self._gpu_bgsub is not None or self.use_opencl:
+            return
+        strips = min(self.detection_strips, self.detection_size[1])
+        if strips < 2:
+            return
+        
+        self._strip_subtractors = [self._create_bg_subtractor() for _ in range(strips)]
+        self._strip_pool = ThreadPoolExecutor(max_workers=strips)
+    
+    def _shutdown_strip_pool(self):
+        if self._strip_pool is not None:
+            self._strip_pool.shutdown(wait=False)
+            self._strip_pool = None
+        self._strip_subtractors = []
+    
+    def _gpu_foreground_mask(self, small, learning_rate):
+        """MOG2 + threshold + morphology on the GPU, only the final mask is downloaded"""
+        try:
+            stream = self._gpu_stream
+            self._gpu_frame.upload(small, stream)
+            fg = self._gpu_bgsub.apply(self._gpu_frame, learning_rate, stream)
+            _, fg = cv2.cuda.threshold(fg, 250, 255, cv2.THRESH_BINARY, stream=stream)
+            fg = self._gpu_morph.apply(fg, stream=stream)
+            fg_mask = fg.download(stream)
+            stream.waitForCompletion()
+            return fg_mask
+        except cv2.error as e:
+            print(f" CUDA detection failed, falling back to CPU: {e}")
+            self._gpu_bgsub = None
+            self._init_strip_detection()
+            # The CPU models haven't seen any frames yet, seed them first. This frame
+            # counts as the first seed frame and detect_motion discards its mask
+            self._warmup_remaining = self._warmup_frames
+            return self._cpu_foreground_mask(small, -1)
+    
+    def _init_gpu_detection(self):
+        """Use the CUDA MOG2 subtractor when OpenCV has CUDA and a device is present"""
+        self._gpu_bgsub = None
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                return
+            self._gpu_bgsub = cv2.cuda.createBackgroundSubtractorMOG2(
+                history=self.mog2_history,
+                varThreshold=self.mog2_var_threshold,
+                detectShadows=self.mog2_detect_shadows
+            )
+            self._gpu_morph = cv2.cuda.createMorphologyFilter(cv2.MORPH_OPEN, cv2.CV_8UC1, self._morph_kernel)
+            self._gpu_frame = cv2.cuda_GpuMat()
+            self._gpu_stream = cv2.cuda.Stream()
+            print(" Using CUDA background subtraction")
+        except (AttributeError, cv2.error):
+            # OpenCV built without CUDA support
+            self._gpu_bgsub = None
+    
+    def _ensure_buffers(self):
+        """Allocate the reusable detection buffers, only touched by the detection thread"""
+        det_width, det_height = self.detection_size
+        if self._fg_buf is not None and self._fg_buf.shape == (det_height, det_width):
+            return
+        
+        self._small_buf = np.empty((det_height, det_width, 3), np.uint8)
+        self._fg_buf = np.empty((det_height, det_width), np.uint8)
+    
+    def _ensure_overlay_buffers(self, frame_shape):
+        """(Re)allocate the overlay buffers when the frame size changes, only touched by
+        the overlay thread so a resize never swaps them under a frame in flight"""
+        if self._overlay_shape == frame_shape:
+            return
+        
+        frame_height, frame_width = frame_shape[:2]
+        self._display_buf = np.empty(frame_shape, np.uint8)
+        self._mask_full_buf = np.empty((frame_height, frame_width), np.uint8)
+        self._red_buf = np.empty((frame_height, frame_width), np.uint8)
+        self._overlay_shape = frame_shape
+    
+    def draw_overlay(self, frame, fg_mask, motion_boxes, motion_detected, frame_shape=None):
+        """Draw motion detection overlay on frame (ndarray or UMat)
+        frame_shape is required for UMat frames, which don't expose their size"""
+        if frame_shape is None:
+            frame_shape = frame.shape
+        frame_height, frame_width = frame_shape[:2]
+        
+        if isinstance(frame, cv2.UMat):
+            # T-API path: blend, boxes and text run on the UMat, through OpenCL where supported.
+            # The UMat is a private upload made by process_frame, so it can be drawn on directly
+            display_frame = frame
+            if fg_mask is not None:
+                mask = cv2.resize(cv2.UMat(fg_mask), (frame_width, frame_height),
+                                  interpolation=cv2.INTER_NEAREST)
+                blue, green, red = cv2.split(frame)
+                red = cv2.addWeighted(red, 0.7, mask, 0.3, 0)
+                display_frame = cv2.merge((blue, green, red))
+        else:
+            self._ensure_overlay_buffers(frame_shape)
+            display_frame = self._display_buf
+            np.copyto(display_frame, frame)
+            
+            if fg_mask is not None and blend_red is not None:
+                # Single compiled pass: nearest upscale + red channel blend, no intermediate buffers
+                blend_red(display_frame, fg_mask)
+            elif fg_mask is not None:
+                # Mask is at detection resolution, upscale it only for drawing
+                fg_mask = cv2.resize(fg_mask, (frame_width, frame_height), dst=self._mask_full_buf,
+                                     interpolation=cv2.INTER_NEAREST)
+                # Blend the mask into the red channel only, no 3-channel overlay is built
+                display_frame[:, :, 2] = cv2.addWeighted(display_frame[:, :, 2], 0.7, fg_mask, 0.3, 0,
+                                                         dst=self._red_buf)
+        
+        for x, y, w, h in motion_boxes:
             cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
         
         status_color = (0, 0, 255) if motion_detected else (0, 255, 0)
@@ -174,78 +550,246 @@ class HalloweenScareSystem:
             cv2.putText(display_frame, f"Cooldown: {cooldown_remaining:.1f}s", (10, 120),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
         
+        # The GUI converts the result to a Tk image from host memory
+        if isinstance(display_frame, cv2.UMat):
+            display_frame = display_frame.get()
+        
         return display_frame
     
     def connect_stream(self):
         """Connect to video stream"""
-        if self.cap is not None:
-            self.cap.release()
+        self._stop_capture()
         
-        self.cap = cv2.VideoCapture(self.stream_url)
+        cap = self._open_capture(self.stream_url)
         
-        if not self.cap.isOpened():
+        if not cap.isOpened():
+            cap.release()
             return False
         
         # Optimize capture settings for lower latency
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer
+        cap.set(cv2.CAP_PROP_FPS, 30)
+        self.cap = cap
         
         # Initialize background subtractor with faster parameters
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-            history=100,  # Reduced from 500 for faster adaptation
-            varThreshold=16,
-            detectShadows=False  # Disable shadow detection for speed
-        )
+        self.bg_subtractor = self._create_bg_subtractor()
+        self._init_gpu_detection()
+        self._init_strip_detection()
+        self._warmup_remaining = self._warmup_frames
+        # Skipped frames before the first detection must not show the previous session's mask
+        self._detect_tick = 0
+        self._last_motion = (False, [])
+        self.motion_mask = None
         
-        # Quick warm up - reduced from 30 to 10 frames
-        for _ in range(10):
-            ret, frame = self.cap.read()
-            if ret:
-                self.bg_subtractor.apply(frame)
+        # Capture, detection and overlay each run on their own thread, so one frame's
+        # detection overlaps the previous frame's overlay and the GUI never blocks
+        # Queues are per connection too, so a stage thread that outlived its stop()
+        # can't push stale frames into the new pipeline
+        stop_event = threading.Event()
+        capture_queue = queue.Queue(maxsize=1)
+        overlay_queue = queue.Queue(maxsize=1)
+        display_queue = queue.Queue(maxsize=1)
+        self._stop_event = stop_event
+        self._display_queue = display_queue
+        self.last_error = None
+        self._stage_threads = [
+            threading.Thread(target=self._capture_loop,
+                             args=(cap, stop_event, capture_queue), daemon=True),
+            threading.Thread(target=self._detection_loop,
+                             args=(stop_event, capture_queue, overlay_queue, display_queue), daemon=True),
+            threading.Thread(target=self._overlay_loop,
+                             args=(stop_event, overlay_queue, display_queue), daemon=True),
+        ]
+        for thread in self._stage_threads:
+            thread.start()
         
         return True
     
-    def process_frame(self):
-        """Process a single frame - optimized for low latency"""
-        if self.cap is None or not self.running:
-            return None, None
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            return None, None
-        
-        with self.processing_lock:
-            self.current_frame = frame
-            
-            if self.paused:
-                return frame, None
-            
-            motion_detected, fg_mask, motion_contours, motion_area = self.detect_motion(frame)
+    def _open_capture(self, url):
+        """Open the stream through a low-latency pipeline that does not queue frames"""
+        if url.startswith(('http://', 'https://')) and TurboJPEG is not None:
+            # MJPEG over HTTP: parse the multipart stream ourselves and decode with libjpeg-turbo
+            try:
+                cap = MJPEGStreamReader(url)
+            except (OSError, RuntimeError) as e:
+                print(f" TurboJPEG unavailable: {e}")
+            else:
+                if cap.isOpened():
+                    return cap
+        
+        if url.startswith(('http://', 'https://')):
+            # MJPEG over HTTP: let GStreamer drop everything but the newest frame
+            pipeline = (
+                f"souphttpsrc location={url} is-live=true ! multipartdemux ! jpegdec ! "
+                "videoconvert ! video/x-raw,format=BGR ! "
+                "appsink max-buffers=1 drop=true sync=false"
+            )
+            cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                return cap
+            cap.release()
+        
+        # Fallback: FFmpeg with input buffering and stream probing turned down
+        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = 'fflags;nobuffer|flags;low_delay|probesize;32'
+        return cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    
+    @staticmethod
+    def _put_latest(stage_queue, item):
+        """Queue an item for the next stage, replacing one it hasn't picked up yet"""
+        try:
+            stage_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            stage_queue.put_nowait(item)
+        except queue.Full:
+            pass
+    
+    def _stage_failed(self, stage, error):
+        """Log a stage failure and report it to the GUI, the stage keeps running"""
+        print(f" {stage} error: {error}")
+        self.last_error = f"{stage} error: {error}"
+        time.sleep(0.1)  # Don't spin if the failure repeats every frame
+    
+    def _capture_loop(self, cap, stop_event, capture_queue):
+        """Continuously drain the stream, keeping only the newest frame"""
+        try:
+            while not stop_event.is_set():
+                try:
+                    if not cap.grab():
+                        time.sleep(0.01)
+                        continue
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        self._put_latest(capture_queue, frame)
+                except Exception as e:
+                    self._stage_failed("Capture", e)
+        finally:
+            # Released here so no other thread can free it while grab() is still blocked
+            cap.release()
+    
+    def _detection_loop(self, stop_event, capture_queue, overlay_queue, display_queue):
+        """Run detection as soon as each new frame arrives, independent of the GUI"""
+        while not stop_event.is_set():
+            try:
+                frame = capture_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
             
-            current_time = time.time()
-            time_since_last_scare = current_time - self.last_scare_time
+            try:
+                result = self.process_frame(frame)
+                if result is None:
+                    # Detection paused (or not started yet): show the raw feed, keep the last mask on screen
+                    self._put_latest(display_queue, self.encode_display(frame, None))
+                else:
+                    self._put_latest(overlay_queue, result)
+            except Exception as e:
+                if not stop_event.is_set():
+                    self._stage_failed("Detection", e)
+    
+    def _overlay_loop(self, stop_event, overlay_queue, display_queue):
+        """Draw the overlay and convert both feeds to display images"""
+        while not stop_event.is_set():
+            try:
+                src, frame_shape, fg_mask, motion_boxes, motion_detected = overlay_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
             
-            if motion_detected and time_since_last_scare >= self.cooldown_seconds:
-                # Play sound in separate thread to avoid blocking
-                threading.Thread(target=self.play_scare_sound, daemon=True).start()
+            try:
+                self.display_frame = self.draw_overlay(src, fg_mask, motion_boxes, motion_detected, frame_shape)
+                self._put_latest(display_queue, self.encode_display(self.display_frame, fg_mask))
+            except Exception as e:
+                if not stop_event.is_set():
+                    self._stage_failed("Overlay", e)
+    
+    def _stop_capture(self):
+        """Stop the pipeline threads and wait for them to exit"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for thread in self._stage_threads:
+            thread.join(timeout=1.0)
+        self._stage_threads = []
+        # A capture thread still blocked in grab() releases its capture once it returns
+        self.cap = None
+    
+    def process_frame(self, frame):
+        """Detect motion in a frame and trigger a scare - returns the overlay stage input,
+        or None while detection is paused"""
+        if self.bg_subtractor is None or not self.running:
+            return None
+        
+        self.current_frame = frame
+        
+        if self.paused:
+            return None
+        
+        # Upload once and share the UMat between detection and overlay (T-API path)
+        if self.use_opencl and self._gpu_bgsub is None:
+            src = cv2.UMat(frame)
+        else:
+            src = frame
+        
+        current_time = time.time()
+        time_since_last_scare = current_time - self.last_scare_time
+        
+        # 10Hz is plenty to trigger a scare, so only every Nth frame goes through detection.
+        # It keeps running during cooldown so the background model goes on adapting
+        self._detect_tick += 1
+        run_detection = self._detect_tick % self._detect_every == 0
+        
+        if run_detection:
+            motion_detected, fg_mask, motion_boxes, motion_area = self.detect_motion(src, frame.shape)
+            self._last_motion = (motion_detected, motion_boxes)
+        else:
+            # Carry the last result forward so the overlay stays steady between detections
+            motion_detected, motion_boxes = self._last_motion
+            fg_mask = self.motion_mask
+        
+        if run_detection and motion_detected and time_since_last_scare >= self.cooldown_seconds:
+            # Channel.play() is non-blocking, mixing happens on SDL's audio thread
+            self.play_scare_sound()
+            with self.processing_lock:
                 self.last_scare_time = current_time
                 self.detection_count += 1
                 self.last_detection_time = datetime.now().strftime('%H:%M:%S')
-            
-            self.display_frame = self.draw_overlay(frame, fg_mask, motion_contours, motion_detected)
-            self.motion_mask = fg_mask
-            
-            return self.display_frame, fg_mask
+        
+        self.motion_mask = fg_mask
+        # The shape travels with the frame, the overlay stage sizes its own buffers from it
+        return src, frame.shape, fg_mask, motion_boxes, motion_detected
+    
+    def encode_display(self, frame, fg_mask):
+        """Resize both feeds to the display size and wrap them as PIL images"""
+        display_width, display_height = self.display_size
+        
+        # Resize with OpenCV before handing pixels to PIL
+        small = cv2.resize(frame, self.display_size, interpolation=cv2.INTER_NEAREST)
+        frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        img = Image.frombuffer('RGB', (display_width, display_height), frame_rgb, 'raw', 'RGB', 0, 1)
+        
+        motion_img = None
+        if fg_mask is not None:
+            # Single channel mask goes straight in as mode 'L'
+            motion_small = cv2.resize(fg_mask, self.display_size, interpolation=cv2.INTER_NEAREST)
+            motion_img = Image.frombuffer('L', (display_width, display_height), motion_small, 'raw', 'L', 0, 1)
+        
+        return img, motion_img
+    
+    def take_display_frames(self):
+        """Return the newest display images, or (None, None) if nothing changed"""
+        try:
+            return self._display_queue.get_nowait()
+        except queue.Empty:
+            return None, None
     
     def stop(self):
         """Stop the system"""
         self.running = False
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
+        self._stop_capture()
         self.bg_subtractor = None
+        self._gpu_bgsub = None
+        self._shutdown_strip_pool()
 
 
 class HalloweenGUI:
@@ -267,6 +811,8 @@ class HalloweenGUI:
         self.scare_system = HalloweenScareSystem()
         self.update_thread = None
         self.is_updating = False
+        self._last_stats_text = None
+        self._error_shown = False  # Status bar shows a pipeline error until frames flow again
         
         self.setup_gui()
         self.update_stats()
@@ -415,12 +961,8 @@ class HalloweenGUI:
         audio_frame = ttk.LabelFrame(left_panel, text="Audio Files", padding=10)
         audio_frame.pack(fill='x', pady=5)
         
-        audio_count = len(self.scare_system.audio_files)
-        audio_text = f"Loaded: {audio_count} sound(s)"
-        if audio_count == 0:
-            audio_text += "\nAdd files to 'scary_sounds' folder"
-        
-        ttk.Label(audio_frame, text=audio_text, justify='left').pack(anchor='w')
+        self.audio_count_label = ttk.Label(audio_frame, text=self.audio_count_text(), justify='left')
+        self.audio_count_label.pack(anchor='w')
         
         reload_btn = tk.Button(
             audio_frame,
@@ -450,6 +992,12 @@ class HalloweenGUI:
         self.motion_label = tk.Label(motion_frame, bg='black')
         self.motion_label.pack(fill='both', expand=True)
         
+        # One Tk photo per feed, new frames are pasted into them instead of
+        # allocating a fresh PhotoImage every tick
+        display_size = self.scare_system.display_size
+        self.video_photo = ImageTk.PhotoImage(Image.new('RGB', display_size))
+        self.motion_photo = ImageTk.PhotoImage(Image.new('L', display_size))
+        
         # Status bar
         self.status_label = ttk.Label(
             self.root,
@@ -459,6 +1007,14 @@ class HalloweenGUI:
         )
         self.status_label.pack(side='bottom', fill='x')
     
+    def audio_count_text(self):
+        """Text for the loaded audio files label"""
+        audio_count = len(self.scare_system.audio_files)
+        audio_text = f"Loaded: {audio_count} sound(s)"
+        if audio_count == 0:
+            audio_text += "\nAdd files to 'scary_sounds' folder"
+        return audio_text
+    
     def update_sensitivity(self, value):
         self.scare_system.sensitivity = int(float(value))
     
@@ -481,7 +1037,7 @@ class HalloweenGUI:
         self.scare_system.load_scary_sounds()
         audio_count = len(self.scare_system.audio_files)
         messagebox.showinfo("Audio Reloaded", f"Loaded {audio_count} sound file(s)")
-        self.setup_gui()  # Refresh the GUI to update audio count
+        self.audio_count_label.config(text=self.audio_count_text())
     
     def start_monitoring(self):
         """Start the monitoring system"""
@@ -509,6 +1065,8 @@ class HalloweenGUI:
         
         self.status_label.config(text="Status: Monitoring for motion...")
         
+        self.video_label.config(image=self.video_photo)
+        self.motion_label.config(image=self.motion_photo)
         self.update_video()
     
     def stop_monitoring(self):
@@ -523,6 +1081,7 @@ class HalloweenGUI:
         
         self.video_label.config(image='')
         self.status_label.config(text="Status: Stopped")
+        self._error_shown = False
     
     def toggle_pause(self):
         """Toggle motion detection pause"""
@@ -539,34 +1098,31 @@ class HalloweenGUI:
         if not self.is_updating:
             return
         
-        frame, motion_mask = self.scare_system.process_frame()
-        
-        if frame is not None:
-            # Update main video feed with reduced processing
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            
-            # Fixed display size
-            display_width = 640
-            display_height = 360
-            img = img.resize((display_width, display_height), Image.Resampling.NEAREST)  # Faster resize
-            
-            photo = ImageTk.PhotoImage(image=img)
-            self.video_label.config(image=photo)
-            self.video_label.image = photo
-        
-        if motion_mask is not None:
-            # Update motion detection feed
-            motion_rgb = cv2.cvtColor(motion_mask, cv2.COLOR_GRAY2RGB)
-            motion_img = Image.fromarray(motion_rgb)
-            motion_img = motion_img.resize((display_width, display_height), Image.Resampling.NEAREST)
-            
-            motion_photo = ImageTk.PhotoImage(image=motion_img)
-            self.motion_label.config(image=motion_photo)
-            self.motion_label.image = motion_photo
-        
-        # Reduced delay for faster updates
-        self.root.after(16, self.update_video)  # ~60fps update rate
+        # Pipeline threads can't touch Tk, surface their failures here
+        error = self.scare_system.last_error
+        if error:
+            self.scare_system.last_error = None
+            self.status_label.config(text=f"Status: {error}")
+            self._error_shown = True
+        
+        # Detection and encoding run on their own threads, only re-render when a new frame is ready
+        img, motion_img = self.scare_system.take_display_frames()
+        
+        if img is not None:
+            self.video_photo.paste(img)
+            if self._error_shown and not error:
+                # Frames are flowing again, the failing stage has recovered
+                self._error_shown = False
+                if self.scare_system.paused:
+                    self.status_label.config(text="Status: Detection Paused")
+                else:
+                    self.status_label.config(text="Status: Monitoring for motion...")
+        
+        if motion_img is not None:
+            self.motion_photo.paste(motion_img)
+        
+        # The camera delivers 30fps at most, render at the same rate
+        self.root.after(33, self.update_video)  # ~30fps update rate
     
     def update_stats(self):
         """Update statistics display"""
@@ -574,7 +1130,10 @@ class HalloweenGUI:
             f"Total Detections: {self.scare_system.detection_count}\n"
             f"Last Detection: {self.scare_system.last_detection_time or 'None'}"
         )
-        self.stats_label.config(text=stats_text)
+        # Skip the config() call (and Tk's geometry pass) when nothing changed
+        if stats_text != self._last_stats_text:
+            self.stats_label.config(text=stats_text)
+            self._last_stats_text = stats_text
         self.root.after(1000, self.update_stats)
     
     def on_closing(self):